@@ -2,7 +2,11 @@
 # emacs: -*- mode: python; py-indent-offset: 4; indent-tabs-mode: nil -*-
 # vi: set ft=python sts=4 ts=4 sw=4 et:
 
+import hashlib
+import os
 import os.path as op
+import tempfile
+
 import numpy as np
 
 from ... import logging
@@ -91,27 +95,30 @@ class DWI2SphericalHarmonicsImage(CommandLine):
     _cmd = "dwi2SH"
     input_spec = DWI2SphericalHarmonicsImageInputSpec
     output_spec = DWI2SphericalHarmonicsImageOutputSpec
+    # (in_file, generated name) pair so repeated calls skip split_filename
+    _outfilename_cache = (None, None)
+    # (filename, absolute path) pair so repeated queries skip os.getcwd()
+    _abspath_cache = (None, None)
 
     def _list_outputs(self):
         outputs = self.output_spec().get()
-        outputs["spherical_harmonics_image"] = self.inputs.out_filename
-        if not isdefined(outputs["spherical_harmonics_image"]):
-            outputs["spherical_harmonics_image"] = op.abspath(self._gen_outfilename())
-        else:
-            outputs["spherical_harmonics_image"] = op.abspath(
-                outputs["spherical_harmonics_image"]
-            )
+        out_file = self.inputs.out_filename
+        if not isdefined(out_file):
+            out_file = self._gen_outfilename()
+        if self._abspath_cache[0] != out_file:
+            self._abspath_cache = (out_file, op.abspath(out_file))
+        outputs["spherical_harmonics_image"] = self._abspath_cache[1]
         return outputs
 
     def _gen_filename(self, name):
-        if name == "out_filename":
-            return self._gen_outfilename()
-        else:
-            return None
+        return self._gen_outfilename() if name == "out_filename" else None
 
     def _gen_outfilename(self):
-        _, name, _ = split_filename(self.inputs.in_file)
-        return name + "_SH.mif"
+        in_file = self.inputs.in_file
+        if self._outfilename_cache[0] != in_file:
+            _, name, _ = split_filename(in_file)
+            self._outfilename_cache = (in_file, name + "_SH.mif")
+        return self._outfilename_cache[1]
 
 
 class ConstrainedSphericalDeconvolutionInputSpec(CommandLineInputSpec):
@@ -218,27 +225,28 @@ class ConstrainedSphericalDeconvolution(CommandLine):
     _cmd = "csdeconv"
     input_spec = ConstrainedSphericalDeconvolutionInputSpec
     output_spec = ConstrainedSphericalDeconvolutionOutputSpec
+    _outfilename_cache = (None, None)
+    _abspath_cache = (None, None)
 
     def _list_outputs(self):
         outputs = self.output_spec().get()
-        outputs["spherical_harmonics_image"] = self.inputs.out_filename
-        if not isdefined(outputs["spherical_harmonics_image"]):
-            outputs["spherical_harmonics_image"] = op.abspath(self._gen_outfilename())
-        else:
-            outputs["spherical_harmonics_image"] = op.abspath(
-                outputs["spherical_harmonics_image"]
-            )
+        out_file = self.inputs.out_filename
+        if not isdefined(out_file):
+            out_file = self._gen_outfilename()
+        if self._abspath_cache[0] != out_file:
+            self._abspath_cache = (out_file, op.abspath(out_file))
+        outputs["spherical_harmonics_image"] = self._abspath_cache[1]
         return outputs
 
     def _gen_filename(self, name):
-        if name == "out_filename":
-            return self._gen_outfilename()
-        else:
-            return None
+        return self._gen_outfilename() if name == "out_filename" else None
 
     def _gen_outfilename(self):
-        _, name, _ = split_filename(self.inputs.in_file)
-        return name + "_CSD.mif"
+        in_file = self.inputs.in_file
+        if self._outfilename_cache[0] != in_file:
+            _, name, _ = split_filename(in_file)
+            self._outfilename_cache = (in_file, name + "_CSD.mif")
+        return self._outfilename_cache[1]
 
 
 class EstimateResponseForSHInputSpec(CommandLineInputSpec):
@@ -299,30 +307,63 @@ class EstimateResponseForSH(CommandLine):
     _cmd = "estimate_response"
     input_spec = EstimateResponseForSHInputSpec
     output_spec = EstimateResponseForSHOutputSpec
+    _outfilename_cache = (None, None)
+    _abspath_cache = (None, None)
 
     def _list_outputs(self):
         outputs = self.output_spec().get()
-        outputs["response"] = self.inputs.out_filename
-        if not isdefined(outputs["response"]):
-            outputs["response"] = op.abspath(self._gen_outfilename())
-        else:
-            outputs["response"] = op.abspath(outputs["response"])
+        out_file = self.inputs.out_filename
+        if not isdefined(out_file):
+            out_file = self._gen_outfilename()
+        if self._abspath_cache[0] != out_file:
+            self._abspath_cache = (out_file, op.abspath(out_file))
+        outputs["response"] = self._abspath_cache[1]
         return outputs
 
     def _gen_filename(self, name):
-        if name == "out_filename":
-            return self._gen_outfilename()
-        else:
-            return None
+        return self._gen_outfilename() if name == "out_filename" else None
 
     def _gen_outfilename(self):
-        _, name, _ = split_filename(self.inputs.in_file)
-        return name + "_ER.txt"
+        in_file = self.inputs.in_file
+        if self._outfilename_cache[0] != in_file:
+            _, name, _ = split_filename(in_file)
+            self._outfilename_cache = (in_file, name + "_ER.txt")
+        return self._outfilename_cache[1]
+
+
+def _loadtxt_fast(fname):
+    """Read a whitespace-delimited numeric text file.
+
+    Splits the text in Python but leaves the string-to-float conversion to
+    NumPy's C-level ``np.array`` constructor, which is considerably faster
+    than the line-by-line parser in ``np.loadtxt`` for bvec/bval files.
+    """
+    with open(fname) as f:
+        rows = [line.split() for line in f if line.strip()]
+    return np.array(rows, dtype=np.float64).squeeze()
 
 
-def concat_files(bvec_file, bval_file, invert_x, invert_y, invert_z):
-    bvecs = np.loadtxt(bvec_file)
-    bvals = np.loadtxt(bval_file)
+def _gradient_hash(bvec_file, bval_file, invert_x, invert_y, invert_z):
+    """Short hash of everything that determines an encoding file's content.
+
+    Covers the bvec/bval file contents and the three inversion flags, and
+    is used to key the generated MRtrix encoding file, so workflows that
+    share one gradient scheme across subjects reuse a single file instead
+    of regenerating it for every invocation.
+    """
+    hasher = hashlib.sha1()
+    for fname in (bvec_file, bval_file):
+        with open(fname, "rb") as f:
+            hasher.update(f.read())
+    hasher.update(b"%d%d%d" % (invert_x, invert_y, invert_z))
+    return hasher.hexdigest()[:12]
+
+
+def concat_files(
+    bvec_file, bval_file, invert_x, invert_y, invert_z, out_encoding_file=None
+):
+    bvecs = _loadtxt_fast(bvec_file)
+    bvals = _loadtxt_fast(bval_file)
     if np.shape(bvecs)[0] > np.shape(bvecs)[1]:
         bvecs = np.transpose(bvecs)
     if invert_x:
@@ -336,14 +377,67 @@ def concat_files(bvec_file, bval_file, invert_x, invert_y, invert_z):
         iflogger.info("Inverting b-vectors in the z direction")
     iflogger.info(np.shape(bvecs))
     iflogger.info(np.shape(bvals))
-    encoding = np.transpose(np.vstack((bvecs, bvals)))
-    _, bvec, _ = split_filename(bvec_file)
-    _, bval, _ = split_filename(bval_file)
-    out_encoding_file = bvec + "_" + bval + ".txt"
-    np.savetxt(out_encoding_file, encoding)
+    encoding = np.empty((bvecs.shape[1], 4), dtype=np.float64)
+    encoding[:, 0:3] = bvecs.T
+    encoding[:, 3] = bvals
+    if out_encoding_file is None:
+        _, bvec, _ = split_filename(bvec_file)
+        _, bval, _ = split_filename(bval_file)
+        out_encoding_file = bvec + "_" + bval + ".txt"
+    # format rows directly rather than through np.savetxt, which adds
+    # several layers of per-row Python (fmt validation, newline handling)
+    fmt = "%.18e %.18e %.18e %.18e\n"
+    # write to a temporary file and rename it into place, so the final
+    # name never points at a partially written table (FSL2MRTrix treats
+    # an existing hash-named file as complete and reuses it)
+    fd, tmp_file = tempfile.mkstemp(
+        prefix=op.basename(out_encoding_file) + ".",
+        dir=op.dirname(out_encoding_file) or ".",
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.writelines(fmt % tuple(row) for row in encoding)
+        os.replace(tmp_file, out_encoding_file)
+    finally:
+        if op.exists(tmp_file):
+            os.unlink(tmp_file)
     return out_encoding_file
 
 
+def batch_concat(pairs, invert_x=False, invert_y=False, invert_z=False, n_jobs=-1):
+    """Convert several bvec/bval pairs to MRtrix encoding files in parallel.
+
+    ``pairs`` is an iterable of (bvec_file, bval_file) tuples; the invert
+    flags apply to every pair. Each encoding file is written next to its
+    bvec file, so per-subject inputs that share one basename (the FSL
+    convention of ``bvecs``/``bvals`` in per-subject directories) do not
+    collide on a common working directory. The conversion is I/O bound,
+    so the pairs are dispatched to a thread pool via joblib (which must
+    be installed separately). Returns the encoding filenames in the order
+    of ``pairs``.
+    """
+    from joblib import Parallel, delayed
+
+    jobs = []
+    for bvec_file, bval_file in pairs:
+        pth, bvec, _ = split_filename(bvec_file)
+        _, bval, _ = split_filename(bval_file)
+        out_encoding_file = op.join(pth, bvec + "_" + bval + ".txt")
+        jobs.append((bvec_file, bval_file, out_encoding_file))
+
+    return Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(concat_files)(
+            bvec_file,
+            bval_file,
+            invert_x,
+            invert_y,
+            invert_z,
+            out_encoding_file=out_encoding_file,
+        )
+        for bvec_file, bval_file, out_encoding_file in jobs
+    )
+
+
 class FSL2MRTrixInputSpec(TraitedSpec):
     bvec_file = File(
         exists=True, mandatory=True, desc="FSL b-vectors file (3xN text file)"
@@ -390,32 +484,49 @@ class FSL2MRTrix(BaseInterface):
 
     input_spec = FSL2MRTrixInputSpec
     output_spec = FSL2MRTrixOutputSpec
+    _outfilename_cache = (None, None)
+    _abspath_cache = (None, None)
 
     def _run_interface(self, runtime):
-        encoding = concat_files(
-            self.inputs.bvec_file,
-            self.inputs.bval_file,
-            self.inputs.invert_x,
-            self.inputs.invert_y,
-            self.inputs.invert_z,
-        )
+        out_file = self._gen_outfilename()
+        # the name embeds a content hash of the gradient files, so an
+        # existing file is guaranteed current and regeneration can be skipped
+        if not op.exists(out_file):
+            concat_files(
+                self.inputs.bvec_file,
+                self.inputs.bval_file,
+                self.inputs.invert_x,
+                self.inputs.invert_y,
+                self.inputs.invert_z,
+                out_encoding_file=out_file,
+            )
         return runtime
 
     def _list_outputs(self):
         outputs = self.output_spec().get()
-        outputs["encoding_file"] = op.abspath(self._gen_filename("out_encoding_file"))
+        out_file = self._gen_filename("out_encoding_file")
+        if self._abspath_cache[0] != out_file:
+            self._abspath_cache = (out_file, op.abspath(out_file))
+        outputs["encoding_file"] = self._abspath_cache[1]
         return outputs
 
     def _gen_filename(self, name):
-        if name == "out_encoding_file":
-            return self._gen_outfilename()
-        else:
-            return None
+        return self._gen_outfilename() if name == "out_encoding_file" else None
 
     def _gen_outfilename(self):
-        _, bvec, _ = split_filename(self.inputs.bvec_file)
-        _, bval, _ = split_filename(self.inputs.bval_file)
-        return bvec + "_" + bval + ".txt"
+        key = (
+            self.inputs.bvec_file,
+            self.inputs.bval_file,
+            self.inputs.invert_x,
+            self.inputs.invert_y,
+            self.inputs.invert_z,
+        )
+        if self._outfilename_cache[0] != key:
+            _, bvec, _ = split_filename(key[0])
+            _, bval, _ = split_filename(key[1])
+            outname = "%s_%s_%s.txt" % (bvec, bval, _gradient_hash(*key))
+            self._outfilename_cache = (key, outname)
+        return self._outfilename_cache[1]
 
 
 class GenerateDirectionsInputSpec(CommandLineInputSpec):
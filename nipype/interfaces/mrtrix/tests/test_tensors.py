@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# emacs: -*- mode: python; py-indent-offset: 4; indent-tabs-mode: nil -*-
+# vi: set ft=python sts=4 ts=4 sw=4 et:
+import os.path as op
+
+import numpy as np
+
+from ..tensors import FSL2MRTrix
+
+
+def _write_gradients(tmpdir):
+    bvecs = np.array(
+        [
+            [0.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0, 0.0],
+            [0.0, 0.0, 0.0, 1.0],
+        ]
+    )
+    bvals = np.array([[0.0, 1000.0, 1000.0, 1000.0]])
+    np.savetxt("grad.bvec", bvecs)
+    np.savetxt("grad.bval", bvals)
+    return "grad.bvec", "grad.bval"
+
+
+def test_fsl2mrtrix_invert_flag_invalidates_cache(tmpdir):
+    tmpdir.chdir()
+    bvec_file, bval_file = _write_gradients(tmpdir)
+
+    fsl2mrtrix = FSL2MRTrix(bvec_file=bvec_file, bval_file=bval_file)
+    out_file = fsl2mrtrix.run().outputs.encoding_file
+    encoding = np.loadtxt(out_file)
+
+    # rerunning with a flipped invert flag must produce a new filename and
+    # a negated column, not reuse the previously written table
+    fsl2mrtrix.inputs.invert_y = True
+    inverted_out_file = fsl2mrtrix.run().outputs.encoding_file
+    assert op.basename(inverted_out_file) != op.basename(out_file)
+    inverted = np.loadtxt(inverted_out_file)
+    assert np.array_equal(inverted[:, 1], -encoding[:, 1])
+    assert np.array_equal(inverted[:, [0, 2, 3]], encoding[:, [0, 2, 3]])
+
+
+def test_fsl2mrtrix_reuses_existing_encoding(tmpdir):
+    tmpdir.chdir()
+    bvec_file, bval_file = _write_gradients(tmpdir)
+
+    fsl2mrtrix = FSL2MRTrix(bvec_file=bvec_file, bval_file=bval_file)
+    out_file = fsl2mrtrix.run().outputs.encoding_file
+
+    # an up-to-date file (same gradients, same flags) is reused, not
+    # rewritten: plant a sentinel and check it survives a second run
+    with open(out_file, "w") as f:
+        f.write("sentinel\n")
+    rerun_out_file = FSL2MRTrix(
+        bvec_file=bvec_file, bval_file=bval_file
+    ).run().outputs.encoding_file
+    assert rerun_out_file == out_file
+    with open(out_file) as f:
+        assert f.read() == "sentinel\n"
@@ -8,6 +8,8 @@
 """
 import os
 import re
+from itertools import chain
+
 import numpy as np
 
 from ..base import (
@@ -91,10 +93,15 @@ class IdentityInterface(IOBase):
                     )
                     raise ValueError(msg)
 
+        inputs = self.inputs
+        # bind the lookups locally; for the dozens of fields typical of
+        # input/output nodes the per-iteration global loads add up
+        get = getattr
+        defined = isdefined
         outputs = self._outputs().get()
         for key in self._fields:
-            val = getattr(self.inputs, key)
-            if isdefined(val):
+            val = get(inputs, key)
+            if defined(val):
                 outputs[key] = val
         return outputs
 
@@ -185,7 +192,6 @@ class Merge(IOBase):
 
     def _list_outputs(self):
         outputs = self._outputs().get()
-        out = []
 
         if self._numinputs < 1:
             return outputs
@@ -196,14 +202,26 @@ class Merge(IOBase):
             ]
 
         if self.inputs.axis == "vstack":
-            for value in values:
-                if isinstance(value, list) and not self.inputs.no_flatten:
-                    out.extend(_ravel(value) if self.inputs.ravel_inputs else value)
-                else:
-                    out.append(value)
+            no_flatten = self.inputs.no_flatten
+            ravel_inputs = self.inputs.ravel_inputs
+            out = list(
+                chain.from_iterable(
+                    (_ravel(value) if ravel_inputs else value)
+                    if isinstance(value, list) and not no_flatten
+                    else (value,)
+                    for value in values
+                )
+            )
         else:
             lists = [ensure_list(val) for val in values]
-            out = [[val[i] for val in lists] for i in range(len(lists[0]))]
+            # the output has one row per element of in1; inputs shorter
+            # than in1 would make zip silently drop rows, so reject them
+            nitems = len(lists[0])
+            if any(len(lst) < nitems for lst in lists[1:]):
+                raise ValueError(
+                    "hstack requires the same number of elements in each input"
+                )
+            out = list(map(list, zip(*lists)))
         outputs["out"] = out
         return outputs
 
@@ -362,9 +380,7 @@ class Split(IOBase):
             splits.extend(self.inputs.splits)
             splits = np.cumsum(splits)
             for i in range(len(splits) - 1):
-                val = np.array(self.inputs.inlist, dtype=object)[
-                    splits[i] : splits[i + 1]
-                ].tolist()
+                val = self.inputs.inlist[splits[i] : splits[i + 1]]
                 if self.inputs.squeeze and len(val) == 1:
                     val = val[0]
                 outputs["out%d" % (i + 1)] = val
@@ -409,10 +425,14 @@ class Select(IOBase):
 
     def _list_outputs(self):
         outputs = self._outputs().get()
-        out = np.array(self.inputs.inlist, dtype=object)[
-            np.array(self.inputs.index)
-        ].tolist()
-        outputs["out"] = out
+        inlist = self.inputs.inlist
+        index = self.inputs.index
+        if len(index) == 1:
+            # OutputMultiPath unwraps one-element lists anyway; skip the
+            # intermediate list for the common single-index case
+            outputs["out"] = inlist[index[0]]
+        else:
+            outputs["out"] = [inlist[i] for i in index]
         return outputs
 
 
@@ -42,6 +42,9 @@ class Function(IOBase):
 
     input_spec = FunctionInputSpec
     output_spec = DynamicTraitedSpec
+    # compiled function handles keyed on (source, imports), shared across
+    # instances so re-running the same Function node skips parse+compile
+    _function_cache = {}
 
     def __init__(
         self,
@@ -98,9 +101,7 @@ class Function(IOBase):
         self._output_names = ensure_list(output_names)
         add_traits(self.inputs, [name for name in self._input_names])
         self.imports = imports
-        self._out = {}
-        for name in self._output_names:
-            self._out[name] = None
+        self._out = [None] * len(self._output_names)
 
     def _set_function_string(self, obj, name, old, new):
         if name == "function_str":
@@ -128,10 +129,18 @@ class Function(IOBase):
         return base
 
     def _run_interface(self, runtime):
-        # Create function handle
-        function_handle = create_function_from_source(
-            self.inputs.function_str, self.imports
+        # Create function handle, reusing a previously compiled one if the
+        # source and imports are unchanged
+        key = (
+            self.inputs.function_str,
+            tuple(self.imports) if self.imports else None,
         )
+        function_handle = self._function_cache.get(key)
+        if function_handle is None:
+            function_handle = create_function_from_source(
+                self.inputs.function_str, self.imports
+            )
+            self._function_cache[key] = function_handle
         # Get function args
         args = {}
         for name in self._input_names:
@@ -141,19 +150,17 @@ class Function(IOBase):
 
         out = function_handle(**args)
         if len(self._output_names) == 1:
-            self._out[self._output_names[0]] = out
+            self._out[0] = out
         else:
             if isinstance(out, tuple) and (len(out) != len(self._output_names)):
                 raise RuntimeError("Mismatch in number of expected outputs")
 
             else:
-                for idx, name in enumerate(self._output_names):
-                    self._out[name] = out[idx]
+                self._out = [out[idx] for idx in range(len(self._output_names))]
 
         return runtime
 
     def _list_outputs(self):
         outputs = self._outputs().get()
-        for key in self._output_names:
-            outputs[key] = self._out[key]
+        outputs.update(zip(self._output_names, self._out))
         return outputs